@@ -132,8 +132,10 @@ def visualizar_comparacion_simple(nodo_inicio, nodo_fin, percfrref, lado, coord_
     
     plt.tight_layout()
     plt.subplots_adjust(top=0.88, bottom=0.15)
-    plt.savefig(f"{poi_name.replace(' ', '_')}_comparacion_lado_derecho.png", dpi=300, bbox_inches='tight')
+    fig.savefig(f"{poi_name.replace(' ', '_')}_comparacion_lado_derecho.png", dpi=300, bbox_inches='tight',
+                pil_kwargs={'compress_level': 1, 'optimize': False})
     plt.show()
+    plt.close(fig)
     
     # Imprimir resultados
     print("=== Cálculo Normal ===")
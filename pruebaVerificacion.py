@@ -3,29 +3,35 @@ import requests
 import json
 import math
 import os
+import numpy as np
 from dotenv import load_dotenv
 
-def calcular_distancia_haversine(lat1, lon1, lat2, lon2):
-    """Calcula la distancia en metros entre dos puntos usando la fórmula de Haversine."""
+# Cargar variables de entorno una sola vez al importar el módulo
+load_dotenv()
+API_KEY = os.getenv('API_GOOGLE')  # Usar API_GOOGLE para Google Places API
+
+def calcular_distancias_haversine(lat, lon, lats, lons):
+    """Calcula en una sola pasada la distancia en metros desde (lat, lon) hasta cada punto de los arreglos lats/lons."""
     # Radio de la Tierra en metros
     R = 6371000
     
+    lats = np.asarray(lats, dtype=np.float64)
+    lons = np.asarray(lons, dtype=np.float64)
+    
     # Convertir coordenadas a radianes
-    phi1 = math.radians(lat1)
-    phi2 = math.radians(lat2)
-    delta_phi = math.radians(lat2 - lat1)
-    delta_lambda = math.radians(lon2 - lon1)
+    phi1 = math.radians(lat)
+    phi2 = np.radians(lats)
+    delta_phi = np.radians(lats - lat)
+    delta_lambda = np.radians(lons - lon)
     
     # Fórmula Haversine
-    a = math.sin(delta_phi/2) * math.sin(delta_phi/2) + \
-        math.cos(phi1) * math.cos(phi2) * \
-        math.sin(delta_lambda/2) * math.sin(delta_lambda/2)
-    c = 2 * math.atan2(math.sqrt(a), math.sqrt(1-a))
+    a = np.sin(delta_phi/2) * np.sin(delta_phi/2) + \
+        math.cos(phi1) * np.cos(phi2) * \
+        np.sin(delta_lambda/2) * np.sin(delta_lambda/2)
+    c = 2 * np.arctan2(np.sqrt(a), np.sqrt(1-a))
     
-    # Distancia en metros
-    d = R * c
-    
-    return d
+    # Distancias en metros
+    return R * c
 
 def buscar_con_google_places(lat, lon, nombre, radio_metros=200, api_key=None):
     """
@@ -70,17 +76,19 @@ def buscar_con_google_places(lat, lon, nombre, radio_metros=200, api_key=None):
             
             # Verificar si hay resultados
             if 'results' in data and len(data['results']) > 0:
-                for place in data['results']:
+                resultados = data['results']
+                
+                # Obtener coordenadas y calcular todas las distancias de una vez
+                ubicaciones = [place.get('geometry', {}).get('location', {}) for place in resultados]
+                lats_encontrados = [location.get('lat', 0) for location in ubicaciones]
+                lons_encontrados = [location.get('lng', 0) for location in ubicaciones]
+                distancias = calcular_distancias_haversine(lat, lon, lats_encontrados, lons_encontrados)
+                
+                # Recorrer los lugares ordenados por distancia
+                for i in np.argsort(distancias, kind='stable').tolist():
+                    place = resultados[i]
                     elemento_nombre = place.get('name', 'Sin nombre')
                     
-                    # Obtener coordenadas
-                    location = place.get('geometry', {}).get('location', {})
-                    elemento_lat = location.get('lat', 0)
-                    elemento_lon = location.get('lng', 0)
-                    
-                    # Calcular distancia
-                    distancia = calcular_distancia_haversine(lat, lon, elemento_lat, elemento_lon)
-                    
                     # Obtener tipos
                     tipos = place.get('types', [])
                     
@@ -95,8 +103,8 @@ def buscar_con_google_places(lat, lon, nombre, radio_metros=200, api_key=None):
                     # Agregar a establecimientos encontrados
                     establecimientos.append({
                         'nombre': elemento_nombre,
-                        'coordenadas': [elemento_lon, elemento_lat],
-                        'distancia_metros': distancia,
+                        'coordenadas': [lons_encontrados[i], lats_encontrados[i]],
+                        'distancia_metros': float(distancias[i]),
                         'tipos': tipos,
                         'direccion': direccion,
                         'abierto_ahora': abierto_ahora,
@@ -104,9 +112,6 @@ def buscar_con_google_places(lat, lon, nombre, radio_metros=200, api_key=None):
                         'place_id': place.get('place_id', '')
                     })
                 
-                # Ordenar por distancia
-                establecimientos.sort(key=lambda x: x['distancia_metros'])
-                
                 return establecimientos, data
             else:
                 return [], data
@@ -125,8 +130,8 @@ def main():
     nombre = "El Tapatio"
     radio = 200  # metros
     
-    # Solicitar clave API
-    api_key = 
+    # Clave API leída del archivo .env
+    api_key = API_KEY
     
     if not api_key:
         print("Se requiere una clave API para continuar.")
@@ -1,9 +1,20 @@
 # procesarPOIs.py
 import os
-import json
 import time
 import math
 from compararPOI import verificar_poi_desde_json
+from utilidades_json import cargar_json, serializar_json
+
+def guardar_json(ruta, datos):
+    """
+    Guarda datos en un archivo JSON indentado, usando orjson si está disponible.
+    
+    Args:
+        ruta: Ruta del archivo de salida
+        datos: Objeto a serializar
+    """
+    with open(ruta, 'wb') as f:
+        f.write(serializar_json(datos, indentar=True))
 
 def calcular_lado_opuesto(nodo_inicio, nodo_fin, punto_poi, lado):
     """
@@ -103,8 +114,11 @@ def procesar_jsons_pois(directorio_entrada, archivo_salida):
         directorio_entrada: Ruta a la carpeta que contiene los archivos JSON de POIs
         archivo_salida: Ruta donde se guardará el archivo JSON de resultados
     """
-    # Verificar que el directorio exista
-    if not os.path.exists(directorio_entrada):
+    # Listar el directorio en una sola llamada; si no existe, scandir falla y no hace falta comprobarlo antes
+    try:
+        with os.scandir(directorio_entrada) as it:
+            entradas = list(it)
+    except FileNotFoundError:
         print(f"El directorio {directorio_entrada} no existe")
         return
     
@@ -117,16 +131,16 @@ def procesar_jsons_pois(directorio_entrada, archivo_salida):
     inicio_tiempo = time.time()
     
     # Recorrer todos los archivos en el directorio
-    for nombre_archivo in os.listdir(directorio_entrada):
+    for entrada in entradas:
+        nombre_archivo = entrada.name
         if nombre_archivo.endswith('.json'):
-            ruta_completa = os.path.join(directorio_entrada, nombre_archivo)
+            ruta_completa = entrada.path
             
             print(f"Procesando archivo: {nombre_archivo}")
             
             try:
                 # Cargar el archivo JSON
-                with open(ruta_completa, 'r', encoding='utf-8') as f:
-                    datos_json = json.load(f)
+                datos_json = cargar_json(ruta_completa)
                 
                 # Si el JSON contiene una lista de elementos
                 if isinstance(datos_json, list):
@@ -216,8 +230,7 @@ def procesar_jsons_pois(directorio_entrada, archivo_salida):
     tiempo_total = time.time() - inicio_tiempo
     
     # Guardar todos los resultados en un archivo JSON
-    with open(archivo_salida, 'w', encoding='utf-8') as f:
-        json.dump(resultados, f, indent=2, ensure_ascii=False)
+    guardar_json(archivo_salida, resultados)
     
     # Mostrar resumen
     print("\n=== Resumen de procesamiento ===")
@@ -238,8 +251,7 @@ def extraer_informacion_resumida(archivo_entrada, archivo_salida):
     """
     try:
         # Cargar resultados completos
-        with open(archivo_entrada, 'r', encoding='utf-8') as f:
-            resultados = json.load(f)
+        resultados = cargar_json(archivo_entrada)
         
         # Lista para almacenar sólo la información solicitada
         info_resumida = []
@@ -278,8 +290,7 @@ def extraer_informacion_resumida(archivo_entrada, archivo_salida):
                 info_resumida.append(resumen)
         
         # Guardar información resumida
-        with open(archivo_salida, 'w', encoding='utf-8') as f:
-            json.dump(info_resumida, f, indent=2, ensure_ascii=False)
+        guardar_json(archivo_salida, info_resumida)
         
         print(f"\nInformación resumida guardada en: {archivo_salida}")
         print(f"Total de POIs en resumen: {len(info_resumida)}")
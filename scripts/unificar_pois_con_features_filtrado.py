@@ -3,6 +3,7 @@ import os
 import json
 import glob
 import math
+import pickle
 from tqdm import tqdm
 import time
 
@@ -64,6 +65,39 @@ def unificar_pois_con_features():
     print(f"POIs que cumplen el filtro MULTIDIGIT y con ambos features: {resultado_info['pois_completos']:,} ({resultado_info['pois_completos']/resultado_info['total_pois']*100:.2f}% si hay POIs)")
     print(f"Archivos JSON generados: {len(resultado_info['archivos']):,}")
 
+def cargar_geojson_con_cache(archivo):
+    """
+    Carga un archivo GeoJSON reutilizando una copia serializada con pickle.
+    
+    La primera carga guarda el objeto parseado en archivo + '.pkl'; en las
+    siguientes ejecuciones se lee esa copia mientras sea más reciente que el
+    GeoJSON original, evitando volver a parsear el JSON completo.
+    
+    Args:
+        archivo: Ruta del archivo GeoJSON
+        
+    Returns:
+        dict: Contenido del GeoJSON
+    """
+    ruta_cache = archivo + ".pkl"
+    try:
+        if os.stat(ruta_cache).st_mtime >= os.stat(archivo).st_mtime:
+            with open(ruta_cache, 'rb') as f:
+                return pickle.load(f)
+    except (OSError, EOFError, pickle.UnpicklingError):
+        pass  # Sin caché válida: se parsea el GeoJSON
+    
+    with open(archivo, 'r', encoding='utf-8') as f:
+        geojson = json.load(f)
+    
+    try:
+        with open(ruta_cache, 'wb') as f:
+            pickle.dump(geojson, f, protocol=pickle.HIGHEST_PROTOCOL)
+    except OSError as e:
+        print(f"No se pudo guardar la caché {ruta_cache}: {str(e)}")
+    
+    return geojson
+
 def cargar_features_con_filtro(directorio_nav, directorio_naming):
     """
     Carga todos los features de los archivos GeoJSON de streets_nav y streets_naming.
@@ -86,26 +120,25 @@ def cargar_features_con_filtro(directorio_nav, directorio_naming):
     
     for archivo in tqdm(archivos_nav, desc="Procesando archivos streets_nav (.geojson)"):
         try:
-            with open(archivo, 'r', encoding='utf-8') as f:
-                geojson = json.load(f)
-                if geojson.get("type") == "FeatureCollection" and "features" in geojson:
-                    for feature in geojson["features"]:
-                        if "properties" in feature and "link_id" in feature["properties"]:
-                            link_id = str(feature["properties"]["link_id"])
-                            street_features['nav'][link_id] = feature
+            geojson = cargar_geojson_con_cache(archivo)
+            if geojson.get("type") == "FeatureCollection" and "features" in geojson:
+                for feature in geojson["features"]:
+                    if "properties" in feature and "link_id" in feature["properties"]:
+                        link_id = str(feature["properties"]["link_id"])
+                        street_features['nav'][link_id] = feature
                             
-                            # Aplicar filtro MULTIDIGIT
-                            properties = feature["properties"]
-                            multidigit = properties.get("MULTIDIGIT", "").upper() == "Y"
-                            ramp = properties.get("RAMP", "").upper() == "Y"
-                            manoeuvre = properties.get("MANOEUVRE", "").upper() == "Y"
-                            dir_travel = properties.get("DIR_TRAVEL", "").upper() == "B"
+                        # Aplicar filtro MULTIDIGIT
+                        properties = feature["properties"]
+                        multidigit = properties.get("MULTIDIGIT", "").upper() == "Y"
+                        ramp = properties.get("RAMP", "").upper() == "Y"
+                        manoeuvre = properties.get("MANOEUVRE", "").upper() == "Y"
+                        dir_travel = properties.get("DIR_TRAVEL", "").upper() == "B"
                             
-                            # Un link_id cumple si:
-                            # 1. Tiene MULTIDIGIT="Yes"
-                            # 2. O si RAMP="Y", MANOEUVRE="Y", o DIR_TRAVEL="B" (excepciones)
-                            if multidigit and not(ramp or manoeuvre or dir_travel):
-                                link_ids_filtrados.add(link_id)
+                        # Un link_id cumple si:
+                        # 1. Tiene MULTIDIGIT="Yes"
+                        # 2. O si RAMP="Y", MANOEUVRE="Y", o DIR_TRAVEL="B" (excepciones)
+                        if multidigit and not(ramp or manoeuvre or dir_travel):
+                            link_ids_filtrados.add(link_id)
         except Exception as e:
             print(f"Error al procesar {archivo}: {str(e)}")
     
@@ -115,23 +148,22 @@ def cargar_features_con_filtro(directorio_nav, directorio_naming):
         print(f"Encontrados {len(archivos_nav_json)} archivos .json adicionales en {directorio_nav}")
         for archivo in tqdm(archivos_nav_json, desc="Procesando archivos .json de streets_nav"):
             try:
-                with open(archivo, 'r', encoding='utf-8') as f:
-                    geojson = json.load(f)
-                    if geojson.get("type") == "FeatureCollection" and "features" in geojson:
-                        for feature in geojson["features"]:
-                            if "properties" in feature and "link_id" in feature["properties"]:
-                                link_id = str(feature["properties"]["link_id"])
-                                street_features['nav'][link_id] = feature
+                geojson = cargar_geojson_con_cache(archivo)
+                if geojson.get("type") == "FeatureCollection" and "features" in geojson:
+                    for feature in geojson["features"]:
+                        if "properties" in feature and "link_id" in feature["properties"]:
+                            link_id = str(feature["properties"]["link_id"])
+                            street_features['nav'][link_id] = feature
                                 
-                                # Aplicar filtro MULTIDIGIT
-                                properties = feature["properties"]
-                                multidigit = properties.get("MULTIDIGIT", "").lower() == "yes"
-                                ramp = properties.get("RAMP", "").upper() == "Y"
-                                manoeuvre = properties.get("MANOEUVRE", "").upper() == "Y"
-                                dir_travel = properties.get("DIR_TRAVEL", "").upper() == "B"
+                            # Aplicar filtro MULTIDIGIT
+                            properties = feature["properties"]
+                            multidigit = properties.get("MULTIDIGIT", "").lower() == "yes"
+                            ramp = properties.get("RAMP", "").upper() == "Y"
+                            manoeuvre = properties.get("MANOEUVRE", "").upper() == "Y"
+                            dir_travel = properties.get("DIR_TRAVEL", "").upper() == "B"
                                 
-                                if multidigit or ramp or manoeuvre or dir_travel:
-                                    link_ids_filtrados.add(link_id)
+                            if multidigit or ramp or manoeuvre or dir_travel:
+                                link_ids_filtrados.add(link_id)
             except Exception as e:
                 print(f"Error al procesar {archivo}: {str(e)}")
     
@@ -144,13 +176,12 @@ def cargar_features_con_filtro(directorio_nav, directorio_naming):
     
     for archivo in tqdm(archivos_naming, desc="Procesando archivos streets_naming"):
         try:
-            with open(archivo, 'r', encoding='utf-8') as f:
-                geojson = json.load(f)
-                if geojson.get("type") == "FeatureCollection" and "features" in geojson:
-                    for feature in geojson["features"]:
-                        if "properties" in feature and "link_id" in feature["properties"]:
-                            link_id = str(feature["properties"]["link_id"])
-                            street_features['naming'][link_id] = feature
+            geojson = cargar_geojson_con_cache(archivo)
+            if geojson.get("type") == "FeatureCollection" and "features" in geojson:
+                for feature in geojson["features"]:
+                    if "properties" in feature and "link_id" in feature["properties"]:
+                        link_id = str(feature["properties"]["link_id"])
+                        street_features['naming'][link_id] = feature
         except Exception as e:
             print(f"Error al procesar {archivo}: {str(e)}")
     
@@ -0,0 +1,57 @@
+# utilidades_json.py
+import json
+import mmap
+
+try:
+    import orjson
+except ImportError:  # orjson es opcional; sin él se usa json de la biblioteca estándar
+    orjson = None
+
+def cargar_json(ruta):
+    """
+    Carga un archivo JSON completo.
+    
+    Si orjson está instalado, el archivo se mapea en memoria y se parsea
+    directamente desde el mmap, evitando la copia intermedia de read().
+    
+    Args:
+        ruta: Ruta del archivo JSON
+        
+    Returns:
+        Objeto Python con el contenido del archivo
+    """
+    if orjson is None:
+        with open(ruta, 'r', encoding='utf-8') as f:
+            return json.load(f)
+    
+    with open(ruta, 'rb') as f:
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+            with memoryview(mm) as contenido:
+                return orjson.loads(contenido)
+
+def parsear_json(contenido):
+    """
+    Parsea bytes JSON ya leídos (respuestas HTTP, entradas de caché).
+    
+    Usa orjson si está instalado; si no, json de la biblioteca estándar.
+    """
+    if orjson is None:
+        return json.loads(contenido)
+    return orjson.loads(contenido)
+
+def serializar_json(datos, indentar=False):
+    """
+    Serializa datos a bytes JSON en UTF-8.
+    
+    Usa orjson si está instalado; si no, json de la biblioteca estándar.
+    
+    Args:
+        datos: Objeto a serializar
+        indentar: Si es True, indenta con 2 espacios; si no, sin indentación
+        
+    Returns:
+        bytes: Documento JSON en UTF-8
+    """
+    if orjson is None:
+        return json.dumps(datos, ensure_ascii=False, indent=2 if indentar else None).encode('utf-8')
+    return orjson.dumps(datos, option=orjson.OPT_INDENT_2 if indentar else None)
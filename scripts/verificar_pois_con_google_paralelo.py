@@ -2,23 +2,55 @@
 import os
 import json
 import time
+import sqlite3
 import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
 import math
+import bisect
+import numpy as np
 import concurrent.futures
 from tqdm import tqdm
 from dotenv import load_dotenv
 from difflib import SequenceMatcher
 from concurrent.futures import ThreadPoolExecutor
 import threading
+from utilidades_json import cargar_json, parsear_json, serializar_json
+
+try:
+    import ijson
+except ImportError:  # ijson es opcional; sin él el archivo de resultados se carga completo
+    ijson = None
+
+try:
+    from rapidfuzz import fuzz, process
+except ImportError:  # rapidfuzz es opcional; sin él se usa difflib
+    fuzz = None
+    process = None
 
 # Cargar variables de entorno
 load_dotenv()
 API_KEY = os.getenv('API_GOOGLE')  # Usar API_GOOGLE para Google Places API
 
-# Crear un lock para escritura segura en archivos
-file_lock = threading.Lock()
-# Lock para estadísticas compartidas
-stats_lock = threading.Lock()
+# Sesión HTTP por hilo: cada hilo reutiliza su conexión TLS con la API de Google
+_sesiones = threading.local()
+
+# Caché en disco de las respuestas de Google Places, compartida entre ejecuciones
+CACHE_PLACES = os.path.join("cache", "places.sqlite")
+CACHE_TTL_SEGUNDOS = 48 * 3600
+# Las búsquedas se agrupan en celdas de 10^-4 grados (~11 m de lado)
+DECIMALES_CELDA = 4
+# Distancia máxima (en metros) de un punto de la celda a su centro; ~7.9 m en el ecuador, donde es mayor
+MEDIA_DIAGONAL_CELDA_METROS = 8
+_cache_places = None  # Conexión SQLite compartida por todos los hilos; se usa siempre bajo cache_lock
+cache_lock = threading.Lock()
+# Un lock por búsqueda para no repetir solicitudes simultáneas de la misma clave
+_candados_busqueda = {}
+_candados_lock = threading.Lock()
+cache_stats = {
+    "aciertos": 0,
+    "fallos": 0
+}
 
 # Estadísticas globales
 stats = {
@@ -29,35 +61,245 @@ stats = {
     "pois_procesados": 0
 }
 
-def similar(a, b):
-    """Calcula la similitud entre dos cadenas de texto."""
-    a = a.lower().strip()
-    b = b.lower().strip()
-    return SequenceMatcher(None, a, b).ratio()
+def iterar_json(ruta):
+    """
+    Recorre uno a uno los elementos de un archivo JSON que contiene un arreglo.
+    
+    Con ijson el arreglo se lee en streaming y la memoria no crece con el
+    tamaño del archivo; sin ijson se carga completo con cargar_json.
+    
+    Args:
+        ruta: Ruta del archivo JSON
+        
+    Yields:
+        Cada elemento del arreglo
+    """
+    if ijson is None:
+        yield from cargar_json(ruta)
+        return
+    
+    with open(ruta, 'rb') as f:
+        yield from ijson.items(f, 'item', use_float=True)
+
+def escribir_atomico(ruta, contenido):
+    """
+    Escribe bytes en un archivo temporal y lo renombra sobre la ruta final.
+    
+    Así el archivo de destino nunca queda a medio escribir si el proceso se
+    interrumpe: contiene la versión anterior o la nueva completa.
+    """
+    ruta_temporal = ruta + ".tmp"
+    with open(ruta_temporal, 'wb') as f:
+        f.write(contenido)
+    os.replace(ruta_temporal, ruta)
+
+def normalizar_nombre(nombre):
+    """Normaliza un nombre para compararlo: minúsculas y sin espacios en los extremos."""
+    return nombre.lower().strip()
+
+def similitudes_nombres(nombre_normalizado, nombres):
+    """
+    Calcula la similitud entre un nombre y cada nombre de una lista.
+    
+    Args:
+        nombre_normalizado: Nombre de referencia, ya pasado por normalizar_nombre
+        nombres: Lista de nombres a comparar
+        
+    Returns:
+        numpy.ndarray: Similitudes entre 0 y 1, en el mismo orden que nombres
+    """
+    nombre = nombre_normalizado
+    nombres = [normalizar_nombre(n) for n in nombres]
+    if process is not None:
+        # Una sola llamada en C++ para comparar contra todos los nombres
+        return process.cdist([nombre], nombres, scorer=fuzz.ratio, dtype=np.float64)[0] / 100
+    return np.array([SequenceMatcher(None, nombre, n).ratio() for n in nombres])
 
-def calcular_distancia(lat1, lon1, lat2, lon2):
-    """Calcula la distancia en metros entre dos puntos geográficos usando la fórmula Haversine."""
+def calcular_distancias(lat, lon, lats, lons):
+    """
+    Calcula en una sola pasada la distancia en metros desde (lat, lon) hasta cada punto de los arreglos lats/lons.
+    
+    Usa la aproximación equirectangular con el coseno de la latitud de referencia,
+    calculado una sola vez. Para las distancias que se comparan aquí (decenas de
+    metros) la diferencia con Haversine es inferior a un milímetro.
+    """
     # Radio de la Tierra en metros
     R = 6371000
     
-    # Convertir coordenadas a radianes
-    phi1 = math.radians(lat1)
-    phi2 = math.radians(lat2)
-    delta_phi = math.radians(lat2 - lat1)
-    delta_lambda = math.radians(lon2 - lon1)
+    lats = np.asarray(lats, dtype=np.float64)
+    lons = np.asarray(lons, dtype=np.float64)
+    
+    # Diferencias en radianes; la de longitud se escala por cos(lat) del punto de referencia
+    cos_phi1 = math.cos(math.radians(lat))
+    delta_phi = np.radians(lats - lat)
+    delta_lambda = np.radians(lons - lon) * cos_phi1
+    
+    # Distancias en metros
+    return R * np.hypot(delta_phi, delta_lambda)
+
+def obtener_sesion():
+    """
+    Devuelve la sesión HTTP del hilo actual, creándola la primera vez.
+    
+    Los hilos del ThreadPoolExecutor reutilizan así la conexión keep-alive con
+    maps.googleapis.com en lugar de abrir una conexión TCP+TLS por cada POI.
+    """
+    sesion = getattr(_sesiones, 'sesion', None)
+    if sesion is None:
+        sesion = requests.Session()
+        sesion.mount('https://', HTTPAdapter(
+            max_retries=Retry(
+                total=3,
+                backoff_factor=0.3,
+                status_forcelist=[429, 500, 502, 503, 504],
+                raise_on_status=False  # Tras los reintentos se devuelve la respuesta para contarla como error de API
+            )
+        ))
+        _sesiones.sesion = sesion
+    return sesion
+
+class LimitadorTasa:
+    """
+    Limitador de tasa tipo token bucket, seguro entre hilos.
+    
+    Reparte las solicitudes a Google Places para no superar la cuota de
+    consultas por segundo, en lugar de recibir errores 429 y reintentar.
+    """
+    def __init__(self, consultas_por_segundo):
+        self.tasa = float(consultas_por_segundo)
+        self.capacidad = max(1.0, self.tasa)
+        self.tokens = self.capacidad
+        self.ultimo = time.monotonic()
+        self.lock = threading.Lock()
+    
+    def esperar(self):
+        """Bloquea el hilo hasta que haya un token disponible y lo consume."""
+        while True:
+            with self.lock:
+                ahora = time.monotonic()
+                self.tokens = min(self.capacidad, self.tokens + (ahora - self.ultimo) * self.tasa)
+                self.ultimo = ahora
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                espera = (1 - self.tokens) / self.tasa
+            time.sleep(espera)
+
+def celda_busqueda(lat, lon, radio_metros):
+    """
+    Devuelve el centro y el radio de la búsqueda en Google Places para un POI.
+    
+    La búsqueda se centra en la celda de 10^-4 grados que contiene al POI y el
+    radio se amplía con la media diagonal de la celda. Así la respuesta cubre
+    el radio pedido alrededor de cualquier POI de la celda y se puede
+    compartir entre todos ellos.
+    
+    Args:
+        lat: Latitud del POI
+        lon: Longitud del POI
+        radio_metros: Radio de búsqueda pedido alrededor del POI
+        
+    Returns:
+        tuple: (Latitud del centro, Longitud del centro, Radio de la búsqueda en metros)
+    """
+    return round(lat, DECIMALES_CELDA), round(lon, DECIMALES_CELDA), radio_metros + MEDIA_DIAGONAL_CELDA_METROS
+
+def clave_cache_places(nombre_normalizado, lat, lon, radio_metros):
+    """
+    Construye la clave de caché de una búsqueda en Google Places.
+    
+    Recibe el nombre ya pasado por normalizar_nombre. POIs con el mismo nombre
+    en la misma celda comparten la clave, porque celda_busqueda les asigna la
+    misma búsqueda.
+    """
+    lat_centro, lon_centro, radio_busqueda = celda_busqueda(lat, lon, radio_metros)
+    return f"{nombre_normalizado}|{lat_centro}|{lon_centro}|{radio_busqueda}"
+
+def candado_busqueda(clave):
+    """
+    Devuelve el lock asociado a una clave de búsqueda, creándolo si no existe.
     
-    # Fórmula Haversine
-    a = math.sin(delta_phi/2) * math.sin(delta_phi/2) + \
-        math.cos(phi1) * math.cos(phi2) * \
-        math.sin(delta_lambda/2) * math.sin(delta_lambda/2)
-    c = 2 * math.atan2(math.sqrt(a), math.sqrt(1-a))
+    Garantiza que POIs casi duplicados procesados a la vez en distintos hilos
+    generen una sola solicitud a Google Places: el primero consulta la API y
+    los demás encuentran la respuesta en la caché.
+    """
+    with _candados_lock:
+        return _candados_busqueda.setdefault(clave, threading.Lock())
+
+def liberar_candado_busqueda(clave, candado):
+    """
+    Descarta el lock de una clave cuando su búsqueda ya terminó.
     
-    # Distancia en metros
-    d = R * c
+    Los hilos que ya esperaban en él lo conservan; los que lleguen después
+    crean uno nuevo y encuentran la respuesta en la caché. Así el diccionario
+    de locks no crece con cada POI procesado.
+    """
+    with _candados_lock:
+        if _candados_busqueda.get(clave) is candado:
+            del _candados_busqueda[clave]
+
+def abrir_cache_places():
+    """
+    Abre la caché en disco, elimina las entradas expiradas y reinicia los
+    contadores de aciertos y fallos, que así corresponden a una sola ejecución.
     
-    return d
+    Se llama una vez desde el hilo principal antes de lanzar los hilos. La
+    conexión se crea con check_same_thread=False para que la usen todos los
+    hilos; el acceso se serializa con cache_lock.
+    """
+    global _cache_places
+    with cache_lock:
+        cache_stats["aciertos"] = 0
+        cache_stats["fallos"] = 0
+        if _cache_places is None:
+            os.makedirs(os.path.dirname(CACHE_PLACES), exist_ok=True)
+            conexion = sqlite3.connect(CACHE_PLACES, check_same_thread=False)
+            conexion.execute(
+                "CREATE TABLE IF NOT EXISTS places (clave TEXT PRIMARY KEY, hora REAL NOT NULL, datos BLOB NOT NULL)"
+            )
+            conexion.execute("DELETE FROM places WHERE hora <= ?", (time.time() - CACHE_TTL_SEGUNDOS,))
+            conexion.commit()
+            _cache_places = conexion
+
+def leer_cache_places(clave):
+    """
+    Devuelve la respuesta de Google Places guardada para la clave, o None si no
+    existe, ya expiró o la caché no está abierta.
+    """
+    with cache_lock:
+        fila = None
+        if _cache_places is not None:
+            fila = _cache_places.execute("SELECT hora, datos FROM places WHERE clave = ?", (clave,)).fetchone()
+        if fila is not None and time.time() - fila[0] < CACHE_TTL_SEGUNDOS:
+            cache_stats["aciertos"] += 1
+            return parsear_json(fila[1])
+        cache_stats["fallos"] += 1
+        return None
 
-def verificar_poi_con_google(poi_name, lon, lat, lon_opuesto=None, lat_opuesto=None, radio_metros=20, api_key=None):
+def guardar_cache_places(clave, data):
+    """Guarda la respuesta de Google Places junto con la hora de la consulta."""
+    contenido = serializar_json(data)
+    with cache_lock:
+        if _cache_places is not None:
+            _cache_places.execute(
+                "INSERT OR REPLACE INTO places (clave, hora, datos) VALUES (?, ?, ?)",
+                (clave, time.time(), contenido)
+            )
+            _cache_places.commit()
+
+def cerrar_cache_places():
+    """Elimina las entradas expiradas y cierra la caché."""
+    global _cache_places
+    with cache_lock:
+        if _cache_places is not None:
+            try:
+                _cache_places.execute("DELETE FROM places WHERE hora <= ?", (time.time() - CACHE_TTL_SEGUNDOS,))
+                _cache_places.commit()
+            finally:
+                _cache_places.close()
+                _cache_places = None
+
+def verificar_poi_con_google(poi_name, lon, lat, lon_opuesto=None, lat_opuesto=None, radio_metros=20, api_key=None, sesion=None, limitador=None):
     """
     Verifica si existe un lugar con nombre similar cerca de las coordenadas dadas usando Google Places API.
     """
@@ -72,23 +314,42 @@ def verificar_poi_con_google(poi_name, lon, lat, lon_opuesto=None, lat_opuesto=N
     # URL de la API Google Places
     url = "https://maps.googleapis.com/maps/api/place/nearbysearch/json"
     
-    # Parámetros para la solicitud
+    # Parámetros para la solicitud; la búsqueda cubre toda la celda del POI para poder compartirla
+    lat_centro, lon_centro, radio_busqueda = celda_busqueda(lat, lon, radio_metros)
     params = {
-        'location': f"{lat},{lon}",
-        'radius': radio_metros,
+        'location': f"{lat_centro},{lon_centro}",
+        'radius': radio_busqueda,
         'keyword': poi_name,
         'language': 'es',
         'key': api_key
     }
     
     try:
-        # Realizar la solicitud
-        response = requests.get(url, params=params)
+        # Consultar primero la caché y solo si no está, realizar la solicitud
+        # El nombre se normaliza una sola vez para la clave de caché y para todas las comparaciones
+        nombre_normalizado = normalizar_nombre(poi_name)
+        clave_cache = clave_cache_places(nombre_normalizado, lat, lon, radio_metros)
+        # Si otro hilo ya está consultando la misma búsqueda, se espera su resultado en la caché
+        candado = candado_busqueda(clave_cache)
+        try:
+            with candado:
+                data = leer_cache_places(clave_cache)
+                if data is None:
+                    if sesion is None:
+                        sesion = obtener_sesion()
+                    if limitador is not None:
+                        limitador.esperar()
+                    response = sesion.get(url, params=params, timeout=(3, 10))
+                    if response.status_code == 200:
+                        data = parsear_json(response.content)
+                        # Solo se guardan respuestas válidas, no errores de cuota o de clave
+                        if data.get('status') in ('OK', 'ZERO_RESULTS'):
+                            guardar_cache_places(clave_cache, data)
+        finally:
+            liberar_candado_busqueda(clave_cache, candado)
         
         # Verificar respuesta
-        if response.status_code == 200:
-            data = response.json()
-            
+        if data is not None:
             # Lista para almacenar lugares encontrados
             lugares_cercanos = []
             
@@ -100,37 +361,56 @@ def verificar_poi_con_google(poi_name, lon, lat, lon_opuesto=None, lat_opuesto=N
             
             # Verificar si hay resultados
             if 'results' in data and len(data['results']) > 0:
-                for place in data['results']:
-                    # Obtener nombre del lugar
-                    nombre_google = place.get('name', '')
-                    
-                    # Calcular similitud del nombre
-                    score_similitud = similar(poi_name, nombre_google)
-                    
-                    # Obtener coordenadas
-                    location = place.get('geometry', {}).get('location', {})
-                    google_lat = location.get('lat', 0)
-                    google_lon = location.get('lng', 0)
-                    
-                    # Calcular distancia a la coordenada original
-                    distancia_original = calcular_distancia(lat, lon, google_lat, google_lon)
-                    
-                    # Calcular distancia a la coordenada del lado opuesto (si se proporcionó)
-                    distancia_opuesto = float('inf')
-                    if lon_opuesto is not None and lat_opuesto is not None:
-                        distancia_opuesto = calcular_distancia(lat_opuesto, lon_opuesto, google_lat, google_lon)
-                    
-                    # Determinar si está más cerca del original o del lado opuesto
-                    mas_cerca_del_opuesto = distancia_opuesto < distancia_original
+                resultados = data['results']
+                
+                # Obtener nombres y coordenadas de todos los lugares
+                nombres_google = [place.get('name', '') for place in resultados]
+                ubicaciones = [place.get('geometry', {}).get('location', {}) for place in resultados]
+                google_lats = [location.get('lat', 0) for location in ubicaciones]
+                google_lons = [location.get('lng', 0) for location in ubicaciones]
+                
+                # Calcular similitudes y distancias de todos los lugares a la vez
+                similitudes = similitudes_nombres(nombre_normalizado, nombres_google)
+                distancias_original = calcular_distancias(lat, lon, google_lats, google_lons)
+                
+                # Distancias a la coordenada del lado opuesto, solo si se proporcionó
+                hay_opuesto = lon_opuesto is not None and lat_opuesto is not None
+                if hay_opuesto:
+                    distancias_opuesto = calcular_distancias(lat_opuesto, lon_opuesto, google_lats, google_lons)
+                    lista_opuesto = distancias_opuesto.tolist()
+                
+                lista_similitudes = similitudes.tolist()
+                lista_original = distancias_original.tolist()
+                
+                # Criterio: al menos un lugar con similitud > 0.6 y distancia < 10m a cualquiera de las coordenadas.
+                # Se evalúa sobre los arreglos, sin recorrer la lista de lugares
+                cerca = distancias_original < 10
+                if hay_opuesto:
+                    cerca |= distancias_opuesto < 10
+                candidatos = np.flatnonzero((similitudes > 0.6) & cerca)
+                if candidatos.size > 0:
+                    # Entre los candidatos, el de mayor similitud y, a igual similitud, el más cercano
+                    i = int(candidatos[np.lexsort((distancias_original[candidatos], -similitudes[candidatos]))[0]])
+                    if lista_original[i] < 10:
+                        verificado_original = True
+                        mensaje = f"Verificado en coordenada original con similitud {lista_similitudes[i]:.2f} y distancia {lista_original[i]:.2f}m"
+                    else:
+                        verificado_opuesto = True
+                        mensaje = f"Verificado en lado opuesto con similitud {lista_similitudes[i]:.2f} y distancia {lista_opuesto[i]:.2f}m"
+                    coordenadas_reales = [google_lons[i], google_lats[i]]
+                
+                # Ordenar por similitud (mayor a menor) y, a igual similitud, por distancia
+                for i in np.lexsort((distancias_original, -similitudes)).tolist():
+                    place = resultados[i]
                     
                     # Agregar a la lista de lugares cercanos
                     lugares_cercanos.append({
-                        'nombre': nombre_google,
-                        'similitud': score_similitud,
-                        'coordenadas': [google_lon, google_lat],
-                        'distancia_metros_original': distancia_original,
-                        'distancia_metros_opuesto': distancia_opuesto if lon_opuesto is not None else None,
-                        'mas_cerca_del_opuesto': mas_cerca_del_opuesto,
+                        'nombre': nombres_google[i],
+                        'similitud': lista_similitudes[i],
+                        'coordenadas': [google_lons[i], google_lats[i]],
+                        'distancia_metros_original': lista_original[i],
+                        'distancia_metros_opuesto': lista_opuesto[i] if hay_opuesto else None,
+                        'mas_cerca_del_opuesto': hay_opuesto and lista_opuesto[i] < lista_original[i],
                         'direccion': place.get('vicinity', ''),
                         'tipos': place.get('types', []),
                         'abierto_ahora': place.get('opening_hours', {}).get('open_now', None),
@@ -138,23 +418,6 @@ def verificar_poi_con_google(poi_name, lon, lat, lon_opuesto=None, lat_opuesto=N
                         'place_id': place.get('place_id', '')
                     })
                 
-                # Ordenar por similitud (mayor a menor)
-                lugares_cercanos.sort(key=lambda x: (-x['similitud'], x['distancia_metros_original']))
-                
-                # Criterio: al menos un lugar con similitud > 0.6 y distancia < 10m a cualquiera de las coordenadas
-                for lugar in lugares_cercanos:
-                    if lugar['similitud'] > 0.6:
-                        if lugar['distancia_metros_original'] < 10:
-                            verificado_original = True
-                            mensaje = f"Verificado en coordenada original con similitud {lugar['similitud']:.2f} y distancia {lugar['distancia_metros_original']:.2f}m"
-                            coordenadas_reales = lugar['coordenadas']
-                            break
-                        elif lon_opuesto is not None and lugar['distancia_metros_opuesto'] < 10:
-                            verificado_opuesto = True
-                            mensaje = f"Verificado en lado opuesto con similitud {lugar['similitud']:.2f} y distancia {lugar['distancia_metros_opuesto']:.2f}m"
-                            coordenadas_reales = lugar['coordenadas']
-                            break
-                
                 return {
                     "verificado": verificado_original,
                     "verificado_lado_opuesto": verificado_opuesto,
@@ -187,7 +450,7 @@ def verificar_poi_con_google(poi_name, lon, lat, lon_opuesto=None, lat_opuesto=N
             "coordenadas_reales": None
         }
 
-def procesar_lote(lote_pois, api_key, radio_metros):
+def procesar_lote(lote_pois, api_key, radio_metros, limitador=None):
     """
     Procesa un lote de POIs en paralelo.
     
@@ -195,12 +458,16 @@ def procesar_lote(lote_pois, api_key, radio_metros):
         lote_pois: Lista de POIs a procesar
         api_key: Clave API para Google Places
         radio_metros: Radio de búsqueda en metros
+        limitador: LimitadorTasa compartido por todos los hilos (None para no limitar)
         
     Returns:
-        tuple: (Resultados completos, Resultados válidos)
+        tuple: (Resultados completos, Resultados válidos, Estadísticas del lote)
     """
     resultados_lote = []
     resultados_validos_lote = []
+    # Contadores propios del lote; se suman a las estadísticas globales en el hilo principal
+    stats_lote = dict.fromkeys(stats, 0)
+    sesion = obtener_sesion()
     
     for poi in lote_pois:
         # Extraer información del POI
@@ -218,52 +485,50 @@ def procesar_lote(lote_pois, api_key, radio_metros):
             
             # Verificar POI con la API de Google
             resultado_verificacion = verificar_poi_con_google(
-                poi_name, lon, lat, lon_opuesto, lat_opuesto, radio_metros, api_key
+                poi_name, lon, lat, lon_opuesto, lat_opuesto, radio_metros, api_key, sesion, limitador
             )
             
             # Crear entrada de resultado completo
-            poi_resultado = poi.copy()  # Mantener todos los datos originales
-            poi_resultado['verificacion'] = resultado_verificacion
+            poi_resultado = {**poi, 'verificacion': resultado_verificacion}  # Mantener todos los datos originales
             
             # Agregar a lista de todos los resultados
             resultados_lote.append(poi_resultado)
             
-            # Actualizar estadísticas y agregar a resultados válidos si corresponde
-            with stats_lock:
-                stats["pois_procesados"] += 1
+            # Actualizar estadísticas del lote y agregar a resultados válidos si corresponde
+            stats_lote["pois_procesados"] += 1
+            
+            if resultado_verificacion['verificado']:
+                # POI correcto (en coordenada original)
+                stats_lote["pois_correctos"] += 1
                 
-                if resultado_verificacion['verificado']:
-                    # POI correcto (en coordenada original)
-                    stats["pois_correctos"] += 1
-                    
-                    # Copiar para resultados válidos sin cambiar coordenadas
-                    poi_valido = poi.copy()
-                    resultados_validos_lote.append(poi_valido)
-                    
-                elif resultado_verificacion['verificado_lado_opuesto']:
-                    # POI en el lado opuesto, hay que corregir sus coordenadas
-                    stats["pois_corregidos"] += 1
-                    
-                    # Copiar para resultados válidos y actualizar coordenadas
-                    poi_valido = poi.copy()
-                    
-                    # Actualizar coordenadas al valor real encontrado
-                    if resultado_verificacion['coordenadas_reales']:
-                        poi_valido['coordenadas_originales'] = poi_valido['coordenadas']  # Guardar original
-                        poi_valido['coordenadas'] = resultado_verificacion['coordenadas_reales']  # Asignar real
-                    
-                    resultados_validos_lote.append(poi_valido)
-                    
+                # El POI de entrada no se modifica, así que se agrega sin copiarlo
+                resultados_validos_lote.append(poi)
+                
+            elif resultado_verificacion['verificado_lado_opuesto']:
+                # POI en el lado opuesto, hay que corregir sus coordenadas
+                stats_lote["pois_corregidos"] += 1
+                
+                # Actualizar coordenadas al valor real encontrado (en un diccionario nuevo, sin tocar el original)
+                poi_valido = poi
+                if resultado_verificacion['coordenadas_reales']:
+                    poi_valido = {
+                        **poi,
+                        'coordenadas': resultado_verificacion['coordenadas_reales'],  # Asignar real
+                        'coordenadas_originales': poi['coordenadas']  # Guardar original
+                    }
+                
+                resultados_validos_lote.append(poi_valido)
+                
+            else:
+                # POI no verificado, se elimina de los resultados válidos
+                if "Error en la API" in resultado_verificacion['mensaje']:
+                    stats_lote["errores_api"] += 1
                 else:
-                    # POI no verificado, se elimina de los resultados válidos
-                    if "Error en la API" in resultado_verificacion['mensaje']:
-                        stats["errores_api"] += 1
-                    else:
-                        stats["pois_eliminados"] += 1
+                    stats_lote["pois_eliminados"] += 1
     
-    return resultados_lote, resultados_validos_lote
+    return resultados_lote, resultados_validos_lote, stats_lote
 
-def verificar_pois_en_paralelo(archivo_entrada, archivo_salida, archivo_resultados_validos, api_key, tamano_lote=100, max_pois=None, radio_metros=20, max_workers=10):
+def verificar_pois_en_paralelo(archivo_entrada, archivo_salida, archivo_resultados_validos, api_key, tamano_lote=100, max_pois=None, radio_metros=20, max_workers=10, consultas_por_segundo=50):
     """
     Verifica la existencia de POIs en paralelo, utilizando múltiples hilos.
     
@@ -276,6 +541,7 @@ def verificar_pois_en_paralelo(archivo_entrada, archivo_salida, archivo_resultad
         max_pois: Máximo de POIs a procesar (None para todos)
         radio_metros: Radio de búsqueda en metros
         max_workers: Número máximo de hilos a utilizar
+        consultas_por_segundo: Máximo de solicitudes por segundo a Google Places (0 para no limitar)
     """
     # Verificar que la API key esté configurada
     if not api_key:
@@ -285,8 +551,7 @@ def verificar_pois_en_paralelo(archivo_entrada, archivo_salida, archivo_resultad
     
     # Cargar los POIs del archivo de entrada
     try:
-        with open(archivo_entrada, 'r', encoding='utf-8') as f:
-            pois = json.load(f)
+        pois = cargar_json(archivo_entrada)
     except Exception as e:
         print(f"Error al cargar el archivo {archivo_entrada}: {str(e)}")
         return
@@ -298,7 +563,16 @@ def verificar_pois_en_paralelo(archivo_entrada, archivo_salida, archivo_resultad
     total_pois = len(pois)
     total_lotes = (total_pois + tamano_lote - 1) // tamano_lote
     
+    # Contar las búsquedas distintas: los POIs casi duplicados comparten una sola
+    claves_busqueda = set()
+    for poi in pois:
+        coordenadas = poi.get('coordenadas', [0, 0])
+        if len(coordenadas) >= 2:
+            claves_busqueda.add(clave_cache_places(normalizar_nombre(poi.get('poi_name', '')), coordenadas[1], coordenadas[0], radio_metros))
+    busquedas_unicas = len(claves_busqueda)
+    
     print(f"Procesando {total_pois} POIs en {total_lotes} lotes usando {max_workers} hilos...")
+    print(f"Búsquedas distintas en Google Places: {busquedas_unicas}")
     
     # Inicializar listas para almacenar resultados
     todos_resultados = []
@@ -313,56 +587,66 @@ def verificar_pois_en_paralelo(archivo_entrada, archivo_salida, archivo_resultad
         lote = pois[i:i+tamano_lote]
         lotes.append(lote)
     
-    # Crear un ThreadPoolExecutor para procesar lotes en paralelo
-    with ThreadPoolExecutor(max_workers=max_workers) as executor:
-        # Enviar tareas al ejecutor
-        futuro_a_indice = {executor.submit(procesar_lote, lote, api_key, radio_metros): i for i, lote in enumerate(lotes)}
-        
-        # Procesar los resultados a medida que se completan
-        for futuro in tqdm(concurrent.futures.as_completed(futuro_a_indice), total=len(lotes), desc="Procesando lotes"):
-            indice_lote = futuro_a_indice[futuro]
-            try:
-                resultados_lote, resultados_validos_lote = futuro.result()
-                
-                # Actualizar resultados
-                with file_lock:
+    # Un único limitador para todos los hilos, de modo que la tasa total respete la cuota
+    limitador = LimitadorTasa(consultas_por_segundo) if consultas_por_segundo and consultas_por_segundo > 0 else None
+    
+    # Los resultados parciales se van agregando lote a lote en archivos JSON Lines
+    archivo_parcial = archivo_salida + ".jsonl"
+    archivo_parcial_validos = archivo_resultados_validos + ".jsonl"
+    open(archivo_parcial, 'wb').close()
+    open(archivo_parcial_validos, 'wb').close()
+    
+    # La caché se abre en el hilo principal y se comparte con los hilos del ejecutor
+    abrir_cache_places()
+    try:
+        # Crear un ThreadPoolExecutor para procesar lotes en paralelo
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+            # Enviar tareas al ejecutor
+            futuro_a_indice = {executor.submit(procesar_lote, lote, api_key, radio_metros, limitador): i for i, lote in enumerate(lotes)}
+            
+            # Procesar los resultados a medida que se completan
+            barra = tqdm(concurrent.futures.as_completed(futuro_a_indice), total=len(lotes), desc="Procesando lotes")
+            for futuro in barra:
+                indice_lote = futuro_a_indice[futuro]
+                try:
+                    resultados_lote, resultados_validos_lote, stats_lote = futuro.result()
+                    
+                    # Sumar las estadísticas del lote (solo el hilo principal modifica stats)
+                    for clave, valor in stats_lote.items():
+                        stats[clave] += valor
+                    
+                    # Actualizar resultados; solo este hilo escribe en los archivos, sin necesidad de lock
                     todos_resultados.extend(resultados_lote)
                     todos_resultados_validos.extend(resultados_validos_lote)
                     
-                    # Guardar resultados parciales
-                    if (indice_lote + 1) % 5 == 0 or indice_lote == len(lotes) - 1:
-                        # Guardar cada 5 lotes completados o en el último lote
-                        with open(archivo_salida, 'w', encoding='utf-8') as f:
-                            json.dump(todos_resultados, f, indent=2, ensure_ascii=False)
-                        
-                        with open(archivo_resultados_validos, 'w', encoding='utf-8') as f:
-                            json.dump(todos_resultados_validos, f, indent=2, ensure_ascii=False)
-                
-                # Mostrar progreso
-                tiempo_transcurrido = time.time() - inicio_tiempo
-                porcentaje_completado = stats["pois_procesados"] / total_pois * 100
-                
-                # Estimar tiempo restante
-                if stats["pois_procesados"] > 0:
-                    tiempo_por_poi = tiempo_transcurrido / stats["pois_procesados"]
-                    tiempo_restante = tiempo_por_poi * (total_pois - stats["pois_procesados"])
+                    # Guardar resultados parciales: solo se agrega el lote nuevo, una línea por lote
+                    with open(archivo_parcial, 'ab') as f:
+                        f.write(serializar_json(resultados_lote) + b"\n")
                     
-                    print(f"\rProgreso: {stats['pois_procesados']}/{total_pois} POIs ({porcentaje_completado:.2f}%) | "
-                          f"Tiempo: {tiempo_transcurrido/60:.2f}m | Restante: {tiempo_restante/60:.2f}m | "
-                          f"Correctos: {stats['pois_correctos']} | Corregidos: {stats['pois_corregidos']} | "
-                          f"Eliminados: {stats['pois_eliminados']}", end="")
-            
-            except Exception as e:
-                print(f"\nError en lote {indice_lote}: {e}")
-    
-    print("\n")  # Nueva línea después de la barra de progreso
+                    with open(archivo_parcial_validos, 'ab') as f:
+                        f.write(serializar_json(resultados_validos_lote) + b"\n")
+                    
+                    # Mostrar progreso en la propia barra; tqdm limita la frecuencia de redibujado
+                    # y ya calcula el tiempo transcurrido y el restante
+                    barra.set_postfix(
+                        pois=f"{stats['pois_procesados']}/{total_pois}",
+                        correctos=stats['pois_correctos'],
+                        corregidos=stats['pois_corregidos'],
+                        eliminados=stats['pois_eliminados'],
+                        refresh=False
+                    )
+                
+                except Exception as e:
+                    barra.write(f"Error en lote {indice_lote}: {e}")
+    finally:
+        cerrar_cache_places()
     
-    # Guardar resultados finales
-    with open(archivo_salida, 'w', encoding='utf-8') as f:
-        json.dump(todos_resultados, f, indent=2, ensure_ascii=False)
+    # Guardar resultados finales una sola vez, sin indentación, y eliminar los parciales
+    escribir_atomico(archivo_salida, serializar_json(todos_resultados))
+    escribir_atomico(archivo_resultados_validos, serializar_json(todos_resultados_validos))
     
-    with open(archivo_resultados_validos, 'w', encoding='utf-8') as f:
-        json.dump(todos_resultados_validos, f, indent=2, ensure_ascii=False)
+    os.remove(archivo_parcial)
+    os.remove(archivo_parcial_validos)
     
     # Calcular estadísticas finales
     total_validos = stats["pois_correctos"] + stats["pois_corregidos"]
@@ -377,6 +661,9 @@ def verificar_pois_en_paralelo(archivo_entrada, archivo_salida, archivo_resultad
         "pois_corregidos": stats["pois_corregidos"],
         "pois_eliminados": stats["pois_eliminados"],
         "errores_api": stats["errores_api"],
+        "busquedas_unicas": busquedas_unicas,
+        "consultas_desde_cache": cache_stats["aciertos"],
+        "consultas_a_api": cache_stats["fallos"],
         "total_pois_validos": total_validos,
         "porcentaje_pois_validos": porcentaje_validos,
         "tiempo_procesamiento_minutos": tiempo_total / 60
@@ -393,25 +680,35 @@ def verificar_pois_en_paralelo(archivo_entrada, archivo_salida, archivo_resultad
     print(f"POIs eliminados (no encontrados): {stats['pois_eliminados']} ({stats['pois_eliminados']/total_pois*100:.2f}%)")
     print(f"Total POIs válidos: {total_validos} ({porcentaje_validos:.2f}%)")
     print(f"Errores de API: {stats['errores_api']}")
+    print(f"Consultas resueltas desde caché: {cache_stats['aciertos']} (a la API: {cache_stats['fallos']})")
     print(f"Tiempo total: {tiempo_total/60:.2f} minutos")
     print(f"Resultados completos guardados en: {archivo_salida}")
     print(f"Resultados válidos guardados en: {archivo_resultados_validos}")
     print(f"Resumen de estadísticas guardado en: resumen_estadisticas.json")
 
+# Rangos de los histogramas del resumen, de menor a mayor, con los límites que los separan
+LIMITES_SIMILITUD = [0.5, 0.6, 0.7, 0.8, 0.9]
+RANGOS_SIMILITUD = ["0.0-0.5", "0.5-0.6", "0.6-0.7", "0.7-0.8", "0.8-0.9", "0.9-1.0"]
+LIMITES_DISTANCIA = [5, 10, 15, 20]
+RANGOS_DISTANCIA = ["0-5m", "5-10m", "10-15m", "15-20m", ">20m"]
+
+# Categoría de estadisticas_calle que corresponde a cada valor de los atributos de la calle
+ATRIBUTOS_CALLE = [
+    ('multidigit', {'YES': 'multidigit_yes', 'Y': 'multidigit_yes', 'NO': 'multidigit_no', 'N': 'multidigit_no'}),
+    ('dir_travel', {'B': 'dir_travel_b', 'F': 'dir_travel_f', 'T': 'dir_travel_t'}),
+    ('ramp', {'Y': 'ramp_y', 'N': 'ramp_n'}),
+    ('manoeuvre', {'Y': 'manoeuvre_y', 'N': 'manoeuvre_n'})
+]
+
 def generar_resumen_verificacion(archivo_entrada, archivo_salida):
     """
     Genera un resumen de verificación con estadísticas detalladas.
     """
     try:
-        # Cargar resultados
-        with open(archivo_entrada, 'r', encoding='utf-8') as f:
-            resultados = json.load(f)
-        
-        # Estadísticas generales
-        total_pois = len(resultados)
-        pois_verificados_original = sum(1 for r in resultados if r.get('verificacion', {}).get('verificado', False))
-        pois_verificados_opuesto = sum(1 for r in resultados if r.get('verificacion', {}).get('verificado_lado_opuesto', False))
-        pois_eliminados = total_pois - pois_verificados_original - pois_verificados_opuesto
+        # Estadísticas generales, acumuladas en la misma pasada que el resto
+        total_pois = 0
+        pois_verificados_original = 0
+        pois_verificados_opuesto = 0
         
         # Estadísticas por similitud
         rangos_similitud = {
@@ -481,23 +778,22 @@ def generar_resumen_verificacion(archivo_entrada, archivo_salida):
             }
         }
         
-        # Estadísticas por tipo de verificación
-        verificacion_por_lado = {
-            "verificado_original": pois_verificados_original,
-            "verificado_opuesto": pois_verificados_opuesto,
-            "eliminado": pois_eliminados
-        }
-        
         # Contadores por tipo de establecimiento
         tipos_establecimiento = {}
         
-        # Analizar cada resultado
-        for resultado in resultados:
+        # Analizar cada resultado, leyendo el archivo en streaming
+        for resultado in iterar_json(archivo_entrada):
             verificacion = resultado.get('verificacion', {})
             lugares_cercanos = verificacion.get('lugares_cercanos', [])
             verificado_original = verificacion.get('verificado', False)
             verificado_opuesto = verificacion.get('verificado_lado_opuesto', False)
             
+            total_pois += 1
+            if verificado_original:
+                pois_verificados_original += 1
+            if verificado_opuesto:
+                pois_verificados_opuesto += 1
+            
             # Determinar estado de verificación
             estado = "eliminados"
             if verificado_original:
@@ -508,33 +804,12 @@ def generar_resumen_verificacion(archivo_entrada, archivo_salida):
             # Análisis de calle
             if 'calle' in resultado:
                 calle = resultado['calle']
-                multidigit = calle.get('multidigit', '').upper()
-                dir_travel = calle.get('dir_travel', '').upper()
-                ramp = calle.get('ramp', '').upper()
-                manoeuvre = calle.get('manoeuvre', '').upper()
                 
                 # Contar atributos de calle según estado de verificación
-                if multidigit == 'YES' or multidigit == 'Y':
-                    estadisticas_calle["multidigit_yes"][estado] += 1
-                elif multidigit == 'NO' or multidigit == 'N':
-                    estadisticas_calle["multidigit_no"][estado] += 1
-                
-                if dir_travel == 'B':
-                    estadisticas_calle["dir_travel_b"][estado] += 1
-                elif dir_travel == 'F':
-                    estadisticas_calle["dir_travel_f"][estado] += 1
-                elif dir_travel == 'T':
-                    estadisticas_calle["dir_travel_t"][estado] += 1
-                
-                if ramp == 'Y':
-                    estadisticas_calle["ramp_y"][estado] += 1
-                elif ramp == 'N':
-                    estadisticas_calle["ramp_n"][estado] += 1
-                
-                if manoeuvre == 'Y':
-                    estadisticas_calle["manoeuvre_y"][estado] += 1
-                elif manoeuvre == 'N':
-                    estadisticas_calle["manoeuvre_n"][estado] += 1
+                for atributo, categorias in ATRIBUTOS_CALLE:
+                    categoria = categorias.get(calle.get(atributo, '').upper())
+                    if categoria is not None:
+                        estadisticas_calle[categoria][estado] += 1
             
             # Análisis de lugares cercanos
             if lugares_cercanos:
@@ -543,31 +818,11 @@ def generar_resumen_verificacion(archivo_entrada, archivo_salida):
                 similitud = lugar_mas_similar.get('similitud', 0)
                 distancia = lugar_mas_similar.get('distancia_metros_original', float('inf'))
                 
-                # Actualizar estadísticas de similitud
-                if similitud >= 0.9:
-                    rangos_similitud["0.9-1.0"] += 1
-                elif similitud >= 0.8:
-                    rangos_similitud["0.8-0.9"] += 1
-                elif similitud >= 0.7:
-                    rangos_similitud["0.7-0.8"] += 1
-                elif similitud >= 0.6:
-                    rangos_similitud["0.6-0.7"] += 1
-                elif similitud >= 0.5:
-                    rangos_similitud["0.5-0.6"] += 1
-                else:
-                    rangos_similitud["0.0-0.5"] += 1
+                # Actualizar estadísticas de similitud (límite inferior incluido en cada rango)
+                rangos_similitud[RANGOS_SIMILITUD[bisect.bisect_right(LIMITES_SIMILITUD, similitud)]] += 1
                 
-                # Actualizar estadísticas de distancia
-                if distancia <= 5:
-                    rangos_distancia["0-5m"] += 1
-                elif distancia <= 10:
-                    rangos_distancia["5-10m"] += 1
-                elif distancia <= 15:
-                    rangos_distancia["10-15m"] += 1
-                elif distancia <= 20:
-                    rangos_distancia["15-20m"] += 1
-                else:
-                    rangos_distancia[">20m"] += 1
+                # Actualizar estadísticas de distancia (límite superior incluido en cada rango)
+                rangos_distancia[RANGOS_DISTANCIA[bisect.bisect_left(LIMITES_DISTANCIA, distancia)]] += 1
                 
                 # Actualizar contador de tipos de establecimiento
                 for tipo in lugar_mas_similar.get('tipos', []):
@@ -575,6 +830,15 @@ def generar_resumen_verificacion(archivo_entrada, archivo_salida):
                         tipos_establecimiento[tipo] = 0
                     tipos_establecimiento[tipo] += 1
         
+        pois_eliminados = total_pois - pois_verificados_original - pois_verificados_opuesto
+        
+        # Estadísticas por tipo de verificación
+        verificacion_por_lado = {
+            "verificado_original": pois_verificados_original,
+            "verificado_opuesto": pois_verificados_opuesto,
+            "eliminado": pois_eliminados
+        }
+        
         # Crear resumen
         resumen = {
             "fecha_generacion": time.strftime("%Y-%m-%d %H:%M:%S"),
@@ -637,6 +901,15 @@ if __name__ == "__main__":
     except ValueError:
         print(f"Valor inválido, usando el valor predeterminado: {max_workers}")
     
+    # Límite de consultas por segundo a la API
+    consultas_por_segundo = 50
+    try:
+        qps_str = input(f"Consultas por segundo a la API [{consultas_por_segundo}]: ").strip()
+        if qps_str:
+            consultas_por_segundo = float(qps_str)
+    except ValueError:
+        print(f"Valor inválido, usando el valor predeterminado: {consultas_por_segundo}")
+    
     # Máximo de POIs a procesar (para pruebas)
     max_pois = None
     try:
@@ -655,7 +928,8 @@ if __name__ == "__main__":
         tamano_lote, 
         max_pois, 
         radio_metros,
-        max_workers
+        max_workers,
+        consultas_por_segundo
     )
     
     # Generar resumen
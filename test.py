@@ -1,47 +1,45 @@
 import json
 import time
+import numpy as np
 
+# Admiten escalares o arreglos de NumPy; con arreglos devuelven una máscara booleana
 def en_cdmx(lat, lon):
-    return 19.2 <= lat <= 19.6 and -99.35 <= lon <= -98.9
+    return (19.2 <= lat) & (lat <= 19.6) & (-99.35 <= lon) & (lon <= -98.9)
 
 def en_toluca(lat, lon):
-    return 19.15 <= lat <= 19.4 and -99.75 <= lon <= -99.50
+    return (19.15 <= lat) & (lat <= 19.4) & (-99.75 <= lon) & (lon <= -99.50)
 
 def extraer_puntos(data):
-    puntos = []
+    """Devuelve un arreglo (N, 2) con todos los puntos [lon, lat] de unas coordenadas GeoJSON anidadas."""
+    try:
+        puntos = np.asarray(data, dtype=np.float64)
+    except ValueError:
+        # Partes de distinta longitud (MultiLineString, Polygon con huecos...): se aplanan por separado
+        return np.concatenate([extraer_puntos(parte) for parte in data])
+    # Coordenadas con altura ([lon, lat, z]): solo se conservan lon y lat
+    return puntos[..., :2].reshape(-1, 2)
 
-    def recorrer(sublista):
-        if isinstance(sublista, list):
-            if len(sublista) == 2 and all(isinstance(i, (int, float)) for i in sublista):
-                puntos.append(sublista)
-            else:
-                for item in sublista:
-                    recorrer(item)
-
-    recorrer(data)
-    return puntos
+def centroide(coordenadas):
+    """Promedio de los vértices de una geometría GeoJSON, como (lat, lon)."""
+    lon, lat = extraer_puntos(coordenadas).mean(axis=0)
+    return lat, lon
 
 def main():
-    long = 0
-    lat = 0
     with open('SREETS_NAMING_ADDRESSING_4815096.geojson', 'r') as f:
         data = json.load(f)
-        
-    for data_ind in data['features']:
-        long = 0
-        lat = 0
-        data_individual = extraer_puntos(data_ind['geometry']['coordinates'])
-        for list in data_individual:
-            num = len(data_individual)
-            x, y = list[0], list[1]
-            long += x
-            lat += y
-        long /= num
-        lat /= num
+    
+    # Centroides de todas las calles en dos arreglos, para evaluar las zonas de una sola vez
+    features = data['features']
+    centroides = np.array([centroide(data_ind['geometry']['coordinates']) for data_ind in features]).reshape(-1, 2)
+    lats, longs = centroides[:, 0], centroides[:, 1]
+    cdmx = en_cdmx(lats, longs)
+    toluca = en_toluca(lats, longs)
+    
+    for i, data_ind in enumerate(features):
         print(data_ind['properties']['ST_NAME'])
-        print(f"lat: {lat}, long: {long}")
-        print(f'CDMX: {en_cdmx(lat, long)}')
-        print(f'TOLUCA: {en_toluca(lat, long)}\n\n')
+        print(f"lat: {lats[i]}, long: {longs[i]}")
+        print(f'CDMX: {cdmx[i]}')
+        print(f'TOLUCA: {toluca[i]}\n\n')
 
 if __name__ == "__main__":
     main()
\ No newline at end of file
@@ -0,0 +1,78 @@
+import math
+import os
+import sys
+import tempfile
+import unittest
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "scripts"))
+
+import verificar_pois_con_google_paralelo as verificador
+
+METROS_POR_GRADO = 6371000 * math.pi / 180
+
+
+class RespuestaFalsa:
+    def __init__(self, data):
+        self.status_code = 200
+        self.content = verificador.serializar_json(data)
+
+
+class SesionFalsa:
+    """Simula Google Places: devuelve los lugares dentro del radio pedido alrededor de location."""
+
+    def __init__(self, lugares):
+        self.lugares = lugares
+        self.solicitudes = []
+
+    def get(self, url, params=None, timeout=None):
+        self.solicitudes.append(params)
+        lat, lon = map(float, params['location'].split(','))
+        resultados = []
+        for nombre, lugar_lat, lugar_lon in self.lugares:
+            distancia = verificador.calcular_distancias(lat, lon, [lugar_lat], [lugar_lon])[0]
+            if distancia <= params['radius']:
+                resultados.append({'name': nombre, 'geometry': {'location': {'lat': lugar_lat, 'lng': lugar_lon}}})
+        return RespuestaFalsa({'results': resultados, 'status': 'OK' if resultados else 'ZERO_RESULTS'})
+
+
+class CacheCompartidaTest(unittest.TestCase):
+    def setUp(self):
+        directorio = tempfile.TemporaryDirectory()
+        self.addCleanup(directorio.cleanup)
+        self.cache_original = verificador.CACHE_PLACES
+        verificador.CACHE_PLACES = os.path.join(directorio.name, "places.sqlite")
+        verificador.abrir_cache_places()
+
+    def tearDown(self):
+        verificador.cerrar_cache_places()
+        verificador.CACHE_PLACES = self.cache_original
+
+    def test_poi_casi_duplicado_se_verifica_con_la_respuesta_compartida(self):
+        # Dos POIs con el mismo nombre en la misma celda, a ~12 m entre sí
+        lat_a, lon_a = 19.40004, -99.10004
+        lat_b, lon_b = 19.39996, -99.09996
+        radio = 20
+        self.assertEqual(
+            verificador.clave_cache_places("oxxo", lat_a, lon_a, radio),
+            verificador.clave_cache_places("oxxo", lat_b, lon_b, radio)
+        )
+
+        # Lugar a 9 m de B, del lado contrario a A (a ~21 m de A, fuera de su radio)
+        cos_lat = math.cos(math.radians(lat_b))
+        d_norte = (lat_b - lat_a) * METROS_POR_GRADO
+        d_este = (lon_b - lon_a) * METROS_POR_GRADO * cos_lat
+        norma = math.hypot(d_norte, d_este)
+        lugar_lat = lat_b + 9 * d_norte / norma / METROS_POR_GRADO
+        lugar_lon = lon_b + 9 * d_este / norma / (METROS_POR_GRADO * cos_lat)
+        self.assertGreater(verificador.calcular_distancias(lat_a, lon_a, [lugar_lat], [lugar_lon])[0], radio)
+
+        sesion = SesionFalsa([("OXXO", lugar_lat, lugar_lon)])
+        verificador.verificar_poi_con_google("OXXO", lon_a, lat_a, radio_metros=radio, api_key="clave", sesion=sesion)
+        resultado_b = verificador.verificar_poi_con_google("OXXO", lon_b, lat_b, radio_metros=radio, api_key="clave", sesion=sesion)
+
+        self.assertEqual(len(sesion.solicitudes), 1)
+        self.assertTrue(resultado_b["verificado"], resultado_b["mensaje"])
+
+
+if __name__ == "__main__":
+    unittest.main()